@@ -1,14 +1,30 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from pathlib import Path
 
-from .db import ingest_meta, ingest_prices, init_db
+from .db import connect, ingest_run, init_db
 from .fetch import BIST_SUBSET, fetch_batch, metas_to_df
 from .io import save_bist
 
 
-def parse_args(argv=None):
+def _positive(kind):
+    """argparse type: parse with `kind` and reject values <= 0."""
+
+    def parse(text: str):
+        value = kind(text)
+        if value <= 0:
+            raise argparse.ArgumentTypeError(f"must be > 0, got {text}")
+        return value
+
+    parse.__name__ = kind.__name__  # keeps argparse's "invalid int value" messages
+    return parse
+
+
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    # Built once and reused when main() is called repeatedly (e.g. from a scheduler)
     p = argparse.ArgumentParser(description="BIST100 Extractor CLI")
     p.add_argument(
         "--range", dest="range_", required=True, help="Yahoo Finance range, e.g., 60d, 1y, 10d"
@@ -20,49 +36,72 @@ def parse_args(argv=None):
         default=Path("data/bist100_prices.db"),
         help="SQLite path (created if missing)",
     )
-    p.add_argument("--prefix", default="BIST100", help="Output file prefix for CSV/XLSX")
-    p.add_argument("--sleep-min", type=float, default=0.8, help="Min sleep between requests")
-    p.add_argument("--sleep-max", type=float, default=1.8, help="Max sleep between requests")
-    return p.parse_args(argv)
+    p.add_argument("--prefix", default="BIST100", help="Output file prefix for Parquet/CSV/XLSX")
+    p.add_argument("--xlsx", action="store_true", help="Also write an Excel file (slow)")
+    p.add_argument(
+        "--workers", type=_positive(int), default=8, help="Concurrent fetch workers (> 0)"
+    )
+    p.add_argument(
+        "--rate",
+        type=_positive(float),
+        default=2.0,
+        help="Max requests per second per Yahoo host (> 0)",
+    )
+    return p
+
+
+def parse_args(argv=None):
+    return _build_parser().parse_args(argv)
 
 
 def main(argv=None) -> int:
     args = parse_args(argv)
 
     # Load tickers
-    symbols = list(BIST_SUBSET)
+    symbols = BIST_SUBSET
 
     # Fetch
     df_all, metas, errs = fetch_batch(
         symbols,
         rng=args.range_,
         interval=args.interval,
-        sleep_min=args.sleep_min,
-        sleep_max=args.sleep_max,
+        max_workers=args.workers,
+        rate_per_host=args.rate,
     )
     print(f"Batch shape: {df_all.shape} | errors: {len(errs)}")
     if errs:
         for k, v in list(errs.items())[:5]:
             print(f"  [WARN] {k} -> {v}")
 
-    # Save CSV/XLSX combined
-    csv_path, xlsx_path = save_bist(
-        df_all, rng=args.range_, interval=args.interval, prefix=args.prefix, out_dir=Path("data")
-    )
-    print(f"[OK] CSV:  {csv_path}")
-    print(f"[OK] XLSX: {xlsx_path}")
-
-    # DB: init + ingest
-    init_db(str(args.db_path))
-    df_meta = metas_to_df(metas)
-    run_id = ingest_prices(
+    # Save Parquet/CSV (+ optional XLSX) combined
+    parquet_path, csv_path, xlsx_path = save_bist(
         df_all,
         rng=args.range_,
         interval=args.interval,
-        db_path=str(args.db_path),
-        note="version 0.1.0",
+        prefix=args.prefix,
+        out_dir=Path("data"),
+        xlsx=args.xlsx,
     )
-    ingest_meta(df_meta, db_path=str(args.db_path), run_id=run_id)
+    print(f"[OK] PARQUET: {parquet_path}")
+    print(f"[OK] CSV:     {csv_path}")
+    if xlsx_path:
+        print(f"[OK] XLSX:    {xlsx_path}")
+
+    # DB: init + ingest over one connection
+    con = connect(str(args.db_path))
+    try:
+        init_db(con=con)
+        df_meta = metas_to_df(metas)
+        run_id = ingest_run(
+            df_all,
+            df_meta,
+            rng=args.range_,
+            interval=args.interval,
+            note="version 0.1.0",
+            con=con,
+        )
+    finally:
+        con.close()
     print(f"[OK] SQLite updated at {args.db_path} (run_id={run_id})")
 
     return 0
@@ -1,20 +1,139 @@
 from __future__ import annotations
 
 import sqlite3
+import threading
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import UTC, datetime
+from itertools import chain, islice, repeat
 
+import numpy as np
 import pandas as pd
 
-from .fetch import META_FIELDS
+from .fetch import META_FIELDS, OHLCV_COLS
 
 DB_PATH = "bist100_prices.db"
 
+# journal_mode is persisted in the file; the others apply per connection.
+_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-64000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+"""
 
-def init_db(db_path: str = DB_PATH):
-    con = sqlite3.connect(db_path)
+# datetime_utc is stored as epoch seconds; Turkish time is derivable on read, e.g.
+# datetime(datetime_utc, 'unixepoch', '+3 hours') (fixed UTC+3, i.e. since Sept 2016) or
+# pd.to_datetime(..., unit="s", utc=True).dt.tz_convert("Europe/Istanbul").
+_PRICES_DDL = """
+    CREATE TABLE IF NOT EXISTS prices (
+        ticker TEXT NOT NULL,
+        datetime_utc INTEGER NOT NULL,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        volume REAL,
+        adjclose REAL,
+        range_str TEXT,
+        interval TEXT,
+        ingested_at TEXT NOT NULL,
+        run_id TEXT NOT NULL,
+        PRIMARY KEY (ticker, datetime_utc, interval)
+    );
+    """
+
+
+def _migrate_prices_text_dt(cur: sqlite3.Cursor) -> None:
+    """Convert an older prices table (TEXT datetimes + local/TR columns) to epoch seconds."""
+    col_types = {row[1]: row[2] for row in cur.execute("PRAGMA table_info(prices);")}
+    if col_types.get("datetime_utc", "").upper() != "TEXT":
+        return
+    cur.execute("ALTER TABLE prices RENAME TO prices_text_dt;")
+    cur.execute(_PRICES_DDL)
+    cur.execute(
+        """
+        INSERT INTO prices (
+            ticker, datetime_utc, open, high, low, close, volume, adjclose,
+            range_str, interval, ingested_at, run_id
+        )
+        SELECT
+            ticker, CAST(strftime('%s', datetime_utc) AS INTEGER),
+            open, high, low, close, volume, adjclose,
+            range_str, interval, ingested_at, run_id
+        FROM prices_text_dt;
+    """
+    )
+    cur.execute("DROP TABLE prices_text_dt;")
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Open SQLite with WAL + relaxed fsync settings suited to bulk upserts.
+    Runs in autocommit mode (isolation_level=None); writes go through _transaction.
+    """
+    con = sqlite3.connect(db_path, isolation_level=None)
+    con.executescript(_PRAGMAS)
+    return con
+
+
+# Per-thread cache of open connections keyed by db_path (sqlite3 connections are not
+# shared across threads by default).
+_local = threading.local()
+
+
+def _get_conn(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Return this thread's cached connection for db_path, opening it on first use."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    con = conns.get(db_path)
+    if con is None:
+        con = conns[db_path] = connect(db_path)
+    return con
+
+
+def close_db(db_path: str | None = None) -> None:
+    """Close this thread's cached connection(s): one db_path, or all if None."""
+    conns = getattr(_local, "conns", {})
+    for path in [db_path] if db_path is not None else list(conns):
+        con = conns.pop(path, None)
+        if con is not None:
+            con.close()
+
+
+@contextmanager
+def _transaction(con: sqlite3.Connection) -> Iterator[sqlite3.Cursor]:
+    """
+    BEGIN IMMEDIATE ... COMMIT, rolling back on error (including a failed COMMIT, e.g.
+    SQLITE_BUSY) so a cached connection is never left inside an open transaction.
+    """
     cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE;")
+    try:
+        yield cur
+        cur.execute("COMMIT;")
+    except BaseException:
+        # SQLite may already have rolled back on its own; don't mask the original error
+        if con.in_transaction:
+            cur.execute("ROLLBACK;")
+        raise
+
+
+def _utc_now_str() -> str:
+    return datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")
 
+
+def init_db(db_path: str = DB_PATH, con: sqlite3.Connection | None = None):
+    con = con or _get_conn(db_path)
+    with _transaction(con) as cur:
+        _create_schema(cur)
+
+
+def _create_schema(cur: sqlite3.Cursor) -> None:
     # Run log
     cur.execute(
         """
@@ -30,29 +149,15 @@ def init_db(db_path: str = DB_PATH):
     )
 
     # Prices table (unique bar per ticker/datetime_utc/interval)
+    _migrate_prices_text_dt(cur)
+    cur.execute(_PRICES_DDL)
+    # Ticker(-range) lookups are served by the PK (ticker, datetime_utc, interval).
+    # Cross-ticker time-range scans use a covering index on (datetime_utc, ticker, close).
+    cur.execute("DROP INDEX IF EXISTS idx_prices_ticker;")
+    cur.execute("DROP INDEX IF EXISTS idx_prices_dt;")
     cur.execute(
-        """
-    CREATE TABLE IF NOT EXISTS prices (
-        ticker TEXT NOT NULL,
-        datetime_utc TEXT NOT NULL,
-        datetime_local TEXT,
-        datetime_tr TEXT,
-        open REAL,
-        high REAL,
-        low REAL,
-        close REAL,
-        volume REAL,
-        adjclose REAL,
-        range_str TEXT,
-        interval TEXT,
-        ingested_at TEXT NOT NULL,
-        run_id TEXT NOT NULL,
-        PRIMARY KEY (ticker, datetime_utc, interval)
-    );
-    """
+        "CREATE INDEX IF NOT EXISTS idx_prices_dt_close ON prices(datetime_utc, ticker, close);"
     )
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_prices_ticker ON prices(ticker);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_prices_dt ON prices(datetime_utc);")
 
     # Meta table (symbol=PK)
     cur.execute(
@@ -87,148 +192,145 @@ def init_db(db_path: str = DB_PATH):
     """
     )
 
-    con.commit()
-    con.close()
 
+_PRICES_INSERT_COLS = (
+    "ticker",
+    "datetime_utc",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "adjclose",
+    "range_str",
+    "interval",
+    "ingested_at",
+    "run_id",
+)
 
-def ingest_prices(
-    df: pd.DataFrame,
-    rng: str,
-    interval: str,
-    db_path: str = DB_PATH,
-    run_id: str | None = None,
-    note: str | None = None,
-):
+_PRICES_UPSERT = (
+    f"INSERT INTO prices ({', '.join(_PRICES_INSERT_COLS)}) VALUES {{values}}"
     """
-    Upsert DataFrame rows into SQLite with run logging.
-    Expects df to have at least: ['ticker','datetime', 'open','high','low','close','volume','adjclose']
-    Adds: ingested_at (UTC ISO), run_id (uuid4 if None)
+    ON CONFLICT(ticker, datetime_utc, interval) DO UPDATE SET
+        open=excluded.open,
+        high=excluded.high,
+        low=excluded.low,
+        close=excluded.close,
+        volume=excluded.volume,
+        adjclose=excluded.adjclose,
+        range_str=excluded.range_str,
+        ingested_at=excluded.ingested_at,
+        run_id=excluded.run_id
+    ;
+"""
+)
+
+
+def _max_variables(con: sqlite3.Connection) -> int:
     """
-    if run_id is None:
-        run_id = str(uuid.uuid4())
+    Bound parameters per statement: the connection limit, capped at SQLite's modern
+    default (32766) to keep statements small; 999 when it can't be queried (Python < 3.11).
+    """
+    try:
+        return min(con.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER), 32766)
+    except AttributeError:
+        return 999
 
-    # Make a working copy and normalize datetime columns
-    d = df.copy()
 
-    # Ensure we have UTC & TR & local naive strings for storage
-    if "datetime" not in d.columns:
-        raise ValueError("DataFrame must include a 'datetime' column (tz-aware).")
+def _epoch_seconds(s: pd.Series) -> np.ndarray:
+    """UTC epoch seconds (int64) for a datetime column; naive values are taken as UTC."""
+    if not isinstance(s.dtype, pd.DatetimeTZDtype):
+        s = pd.to_datetime(s, utc=True)
+    return s.dt.as_unit("s").astype("int64").to_numpy()
+
+
+def _db_values(s: pd.Series) -> np.ndarray:
+    """
+    Column values for binding. float64 columns are passed through untouched (numpy.float64
+    is a float subclass and SQLite stores NaN as NULL); anything else becomes an object
+    array with NaN/NaT/pd.NA mapped to None.
+    """
+    if s.dtype == np.float64:
+        return s.to_numpy()
+    return s.to_numpy(dtype=object, na_value=None)
 
-    # Build UTC (naive, ISO 8601), local (naive), TR (naive)
-    if pd.api.types.is_datetime64tz_dtype(d["datetime"]):
-        dt_utc = d["datetime"].dt.tz_convert("UTC").dt.tz_localize(None)
-        dt_local = d["datetime"].dt.tz_localize(None)
-        dt_tr = d["datetime"].dt.tz_convert("Europe/Istanbul").dt.tz_localize(None)
-    else:
-        # Assume naive = local; convert to UTC string (best-effort)
-        dt_local = d["datetime"]
-        dt_utc = pd.to_datetime(d["datetime"], utc=True).dt.tz_localize(None)
-        dt_tr = (
-            pd.to_datetime(d["datetime"], utc=True)
-            .dt.tz_convert("Europe/Istanbul")
-            .dt.tz_localize(None)
-        )
 
-    d["datetime_utc"] = dt_utc.dt.strftime("%Y-%m-%d %H:%M:%S")
-    d["datetime_local"] = dt_local.dt.strftime("%Y-%m-%d %H:%M:%S")
-    d["datetime_tr"] = dt_tr.dt.strftime("%Y-%m-%d %H:%M:%S")
-
-    # Rename 'range' -> 'range_str' to avoid SQL keyword weirdness
-    if "range" in d.columns:
-        d = d.rename(columns={"range": "range_str"})
-    # Ensure interval column exists even if not in df (batch function already sets it)
-    if "interval" not in d.columns:
-        d["interval"] = interval
-    if "range_str" not in d.columns:
-        d["range_str"] = rng
-
-    # Add ingestion metadata
-    ingested_at = datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")
-    d["ingested_at"] = ingested_at
-    d["run_id"] = run_id
-
-    # Select/align columns for DB
-    cols = [
-        "ticker",
-        "datetime_utc",
-        "datetime_local",
-        "datetime_tr",
-        "open",
-        "high",
-        "low",
-        "close",
-        "volume",
-        "adjclose",
-        "range_str",
-        "interval",
-        "ingested_at",
-        "run_id",
-    ]
-    missing = [
-        c for c in ["ticker", "open", "high", "low", "close", "volume"] if c not in d.columns
-    ]
+def _upsert_prices(
+    cur: sqlite3.Cursor,
+    df: pd.DataFrame,
+    rng: str,
+    interval: str,
+    run_id: str,
+    ingested_at: str,
+) -> int:
+    if "datetime" not in df.columns:
+        raise ValueError("DataFrame must include a 'datetime' column (tz-aware).")
+    missing = [c for c in ("ticker", *OHLCV_COLS) if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required columns: {missing}")
 
-    d_db = d[cols].copy()
-    d_db = d_db.where(pd.notnull(d_db), None)  # replace NaN/NaT/pd.NA with None
-    d_db = d_db.astype(object)  # ensure Python objects, not numpy dtypes
+    n = len(df)
 
-    # Upsert into SQLite
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
+    def col_or(names, default):
+        for c in names:
+            if c in df.columns:
+                return _db_values(df[c])
+        return repeat(default, n)
 
-    cur.executemany(
-        """
-        INSERT INTO prices (
-            ticker, datetime_utc, datetime_local, datetime_tr,
-            open, high, low, close, volume, adjclose,
-            range_str, interval, ingested_at, run_id
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(ticker, datetime_utc, interval) DO UPDATE SET
-            open=excluded.open,
-            high=excluded.high,
-            low=excluded.low,
-            close=excluded.close,
-            volume=excluded.volume,
-            adjclose=excluded.adjclose,
-            range_str=excluded.range_str,
-            ingested_at=excluded.ingested_at,
-            run_id=excluded.run_id
-        ;
-    """,
-        list(map(tuple, d_db.values)),
+    # Lazy row tuples zipped from column arrays (no frame copy, no per-row strftime)
+    rows = zip(
+        _db_values(df["ticker"]),
+        _epoch_seconds(df["datetime"]).tolist(),
+        *(_db_values(df[c]) for c in OHLCV_COLS),
+        col_or(["adjclose"], None),
+        col_or(["range_str", "range"], rng),  # 'range' is stored as range_str
+        col_or(["interval"], interval),
+        repeat(ingested_at, n),
+        repeat(run_id, n),
+        strict=True,
     )
 
-    # Log the run
+    # Multi-row INSERT ... VALUES (...), (...): one statement per chunk instead of per row
+    width = len(_PRICES_INSERT_COLS)
+    per_stmt = max(1, _max_variables(cur.connection) // width)
+    row_sql = "(" + ",".join(["?"] * width) + ")"
+    stmts: dict[int, str] = {}
+    while chunk := list(islice(rows, per_stmt)):
+        k = len(chunk)
+        if k not in stmts:
+            stmts[k] = _PRICES_UPSERT.format(values=",".join([row_sql] * k))
+        cur.execute(stmts[k], list(chain.from_iterable(chunk)))
+    return n
+
+
+def _log_run(
+    cur: sqlite3.Cursor,
+    run_id: str,
+    started_at: str,
+    rng: str,
+    interval: str,
+    n_rows: int,
+    note: str | None,
+) -> None:
     cur.execute(
         """
         INSERT OR REPLACE INTO runs (run_id, started_at, rng, interval, n_rows, note)
         VALUES (?, ?, ?, ?, ?, ?);
     """,
-        (run_id, ingested_at, rng, interval, int(len(d_db)), note),
+        (run_id, started_at, rng, interval, n_rows, note),
     )
 
-    con.commit()
-    con.close()
-    return run_id
-
-
-def ingest_meta(df_meta: pd.DataFrame, db_path: str = DB_PATH, run_id: str | None = None):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-
-    # NaN/NA → None ve Python-native tiplere çevir
-    d = df_meta.copy()
-    d = d.where(pd.notnull(d), None).astype(object)
-
-    # ingest meta timestamp
-    ingested_at = datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")
-    d["ingested_at"] = ingested_at
-    d["run_id"] = run_id or "manual"
 
+def _upsert_meta(cur: sqlite3.Cursor, df_meta: pd.DataFrame, run_id: str, ingested_at: str):
+    # Row tuples zipped from column arrays; NaN/NA → None in the same pass
+    n = len(df_meta)
     cols = META_FIELDS + ["ingested_at", "run_id"]
-    tuples = list(map(tuple, d[cols].values))
+    rows = zip(
+        *(_db_values(df_meta[c]) for c in META_FIELDS),
+        repeat(ingested_at, n),
+        repeat(run_id, n),
+        strict=True,
+    )
 
     cur.executemany(
         f"""
@@ -261,8 +363,69 @@ def ingest_meta(df_meta: pd.DataFrame, db_path: str = DB_PATH, run_id: str | Non
             run_id=excluded.run_id
         ;
     """,
-        tuples,
+        rows,
     )
 
-    con.commit()
-    con.close()
+
+def ingest_prices(
+    df: pd.DataFrame,
+    rng: str,
+    interval: str,
+    db_path: str = DB_PATH,
+    run_id: str | None = None,
+    note: str | None = None,
+    con: sqlite3.Connection | None = None,
+):
+    """
+    Upsert DataFrame rows into SQLite with run logging.
+    Expects df to have at least: ['ticker','datetime', 'open','high','low','close','volume','adjclose']
+    Adds: ingested_at (UTC ISO), run_id (uuid4 if None)
+    Stores datetime_utc as integer epoch seconds.
+    Uses `con` if given, else this thread's cached connection for db_path.
+    """
+    if run_id is None:
+        run_id = str(uuid.uuid4())
+    ingested_at = _utc_now_str()
+
+    con = con or _get_conn(db_path)
+    with _transaction(con) as cur:
+        n = _upsert_prices(cur, df, rng, interval, run_id, ingested_at)
+        _log_run(cur, run_id, ingested_at, rng, interval, n, note)
+    return run_id
+
+
+def ingest_meta(
+    df_meta: pd.DataFrame,
+    db_path: str = DB_PATH,
+    run_id: str | None = None,
+    con: sqlite3.Connection | None = None,
+):
+    con = con or _get_conn(db_path)
+    with _transaction(con) as cur:
+        _upsert_meta(cur, df_meta, run_id or "manual", _utc_now_str())
+
+
+def ingest_run(
+    df: pd.DataFrame,
+    df_meta: pd.DataFrame,
+    rng: str,
+    interval: str,
+    db_path: str = DB_PATH,
+    run_id: str | None = None,
+    note: str | None = None,
+    con: sqlite3.Connection | None = None,
+):
+    """
+    Prices + meta + run log in a single BEGIN IMMEDIATE transaction (one commit per run).
+    Returns the run_id.
+    """
+    if run_id is None:
+        run_id = str(uuid.uuid4())
+    ingested_at = _utc_now_str()
+
+    con = con or _get_conn(db_path)
+    with _transaction(con) as cur:
+        n = _upsert_prices(cur, df, rng, interval, run_id, ingested_at)
+        _upsert_meta(cur, df_meta, run_id, ingested_at)
+        _log_run(cur, run_id, ingested_at, rng, interval, n, note)
+    return run_id
@@ -1,15 +1,37 @@
 from __future__ import annotations
 
-import random
-import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 from urllib.parse import urlencode
 
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 
 from .session import get_yahoo_session
 
+YAHOO_HOSTS = ("query1.finance.yahoo.com", "query2.finance.yahoo.com")
+OHLCV_COLS = ("open", "high", "low", "close", "volume")
+
+
+def _float_array(values: list | None, n: int) -> np.ndarray:
+    """
+    Yahoo value list -> float64 array of length n in one vectorized pass (None -> NaN).
+    Short lists are NaN-padded, long ones truncated; non-numeric junk falls back to coercion.
+    """
+    try:
+        arr = np.asarray(values or [], dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    if len(arr) != n:
+        out = np.full(n, np.nan)
+        m = min(n, len(arr))
+        out[:m] = arr[:m]
+        arr = out
+    return arr
+
 
 # ---------- single-ticker fetch ----------
 def fetch_yahoo_chart(
@@ -19,21 +41,16 @@ def fetch_yahoo_chart(
     include_prepost: bool = False,
     timeout: int = 20,
     session: requests.Session | None = None,
+    hosts: Sequence[str] = YAHOO_HOSTS,
 ):
     """
-    Robust Yahoo Finance chart fetch with cookie warm-up, retry, and host failover.
+    Robust Yahoo Finance chart fetch with retry and host failover.
+    `hosts` are tried in order. Cookies come from the session (see get_yahoo_session).
     Adds 'ticker' column.
     """
     sess = session or get_yahoo_session()
-    headers = {**sess.headers, "Referer": f"https://finance.yahoo.com/quote/{symbol}/chart"}
-
-    # warm-up cookies
-    try:
-        sess.get(
-            f"https://finance.yahoo.com/quote/{symbol}/chart", headers=headers, timeout=timeout
-        )
-    except Exception:
-        pass
+    # requests merges per-call headers over sess.headers; no need to copy them here
+    headers = {"Referer": f"https://finance.yahoo.com/quote/{symbol}/chart"}
 
     params = {
         "range": rng,
@@ -43,23 +60,21 @@ def fetch_yahoo_chart(
         "corsDomain": "finance.yahoo.com",
     }
 
-    hosts = ["query1.finance.yahoo.com", "query2.finance.yahoo.com"]
     data = None
     last_exc = None
 
-    for host in hosts * 2:
+    # 429/5xx and connection errors are retried with exponential backoff (honouring
+    # Retry-After) by the session's urllib3 Retry; a host that still fails hands over
+    # to the next one.
+    for host in hosts:
         url = f"https://{host}/v8/finance/chart/{symbol}?{urlencode(params)}"
         try:
             r = sess.get(url, headers=headers, timeout=timeout)
-            if r.status_code == 429:
-                time.sleep(1.25 + random.random())
-                continue
             r.raise_for_status()
-            data = r.json()
+            data = orjson.loads(r.content)  # parses raw bytes; no r.text decode
             break
         except Exception as e:
             last_exc = e
-            time.sleep(0.4 + random.random())
 
     if data is None:
         raise RuntimeError(f"Failed to fetch {symbol}. Last error: {last_exc}")
@@ -73,7 +88,6 @@ def fetch_yahoo_chart(
         raise RuntimeError(f"Empty 'result' for {symbol}.")
 
     meta = result.get("meta", {}) or {}
-    tz_name = meta.get("timezone", "UTC")
     timestamps = result.get("timestamp") or []
     if not timestamps:
         raise ValueError(f"No timestamps for {symbol}.")
@@ -83,62 +97,80 @@ def fetch_yahoo_chart(
     adj_block = (indicators.get("adjclose") or [{}])[0] if indicators.get("adjclose") else {}
     adj_list = adj_block.get("adjclose", [])
 
-    # Build frame
-    dt_index = pd.to_datetime(pd.Series(timestamps, dtype="int64"), unit="s", utc=True)
-    try:
-        dt_local = dt_index.tz_convert(tz_name)
-    except Exception:
-        dt_local = dt_index
+    # Build frame: 'datetime' is tz-aware UTC, straight from the int64 epoch array.
+    # Local/Turkish times are derived where needed (save_bist, SQLite reads).
+    ts_arr = np.asarray(timestamps, dtype=np.int64)
+    dt_utc = pd.to_datetime(ts_arr, unit="s", utc=True)
 
-    df = pd.DataFrame({"datetime": dt_local})
-    for col in ["open", "high", "low", "close", "volume"]:
-        df[col] = pd.to_numeric(pd.Series(quote_block.get(col, [])), errors="coerce")
+    # Collect all columns first and build the frame in one go (no per-column inserts)
+    cols: dict[str, Any] = {"datetime": dt_utc}
+    n = len(timestamps)
+    for col in OHLCV_COLS:
+        cols[col] = _float_array(quote_block.get(col), n)
 
-    if adj_list and len(adj_list) == len(df):
-        df["adjclose"] = pd.to_numeric(pd.Series(adj_list), errors="coerce")
+    if adj_list and len(adj_list) == n:
+        cols["adjclose"] = _float_array(adj_list, n)
     else:
-        df["adjclose"] = pd.NA
-
-    df["ticker"] = symbol
-    df["range"] = rng
-    df["interval"] = interval
+        cols["adjclose"] = np.full(n, np.nan)
 
-    # Turkish local time
-    try:
-        df["datetime_tr"] = df["datetime"].dt.tz_convert("Europe/Istanbul")
-    except Exception:
-        df["datetime_tr"] = pd.to_datetime(df["datetime"], utc=True).dt.tz_convert(
-            "Europe/Istanbul"
-        )
+    cols["ticker"] = symbol
+    cols["range"] = rng
+    cols["interval"] = interval
 
-    df = df.sort_values("datetime").reset_index(drop=True)
+    df = pd.DataFrame(cols)
+    # Yahoo returns bars in time order; only pay for a sort when it doesn't
+    if not dt_utc.is_monotonic_increasing:
+        df = df.sort_values("datetime", kind="stable").reset_index(drop=True)
     return df, meta
 
 
 # ---------- batch fetch ----------
 def fetch_batch(
-    symbols, rng: str = "12d", interval: str = "5m", sleep_min: float = 0.8, sleep_max: float = 1.8
+    symbols,
+    rng: str = "12d",
+    interval: str = "5m",
+    max_workers: int = 8,
+    rate_per_host: float | None = 2.0,
+    session: requests.Session | None = None,
 ):
-    sess = get_yahoo_session()
-    frames, metas, errors = [], {}, {}
+    """
+    Fetch many symbols concurrently over one shared session.
+    Requests are throttled per host (`rate_per_host` req/s) and alternate between
+    the Yahoo query hosts. Duplicate symbols are fetched once; output frames keep the
+    order of `symbols`. A given `session` is used as-is (`rate_per_host` then only
+    applies to the session built here).
+    """
+    symbols = tuple(dict.fromkeys(symbols))
+    sess = session or get_yahoo_session(rate_per_host=rate_per_host, burst=max(1, max_workers // 2))
+    results, metas, errors = {}, {}, {}
+    n = len(symbols)
 
-    for i, sym in enumerate(symbols, 1):
-        try:
-            df_sym, meta = fetch_yahoo_chart(sym, rng=rng, interval=interval, session=sess)
-            frames.append(df_sym)
-            metas[sym] = meta
-            print(f"[{i}/{len(symbols)}] OK  {sym}  -> {len(df_sym)} rows")
-        except Exception as e:
-            errors[sym] = str(e)
-            print(f"[{i}/{len(symbols)}] ERR {sym} -> {e}")
-        time.sleep(random.uniform(sleep_min, sleep_max))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for i, sym in enumerate(symbols):
+            k = i % len(YAHOO_HOSTS)
+            hosts = YAHOO_HOSTS[k:] + YAHOO_HOSTS[:k]
+            fut = pool.submit(
+                fetch_yahoo_chart, sym, rng=rng, interval=interval, session=sess, hosts=hosts
+            )
+            futures[fut] = sym
 
+        for done, fut in enumerate(as_completed(futures), 1):
+            sym = futures[fut]
+            try:
+                df_sym, meta = fut.result()
+                results[sym] = df_sym
+                metas[sym] = meta
+                print(f"[{done}/{n}] OK  {sym}  -> {len(df_sym)} rows")
+            except Exception as e:
+                errors[sym] = str(e)
+                print(f"[{done}/{n}] ERR {sym} -> {e}")
+
+    frames = [results[sym] for sym in symbols if sym in results]
     df_all = (
         pd.concat(frames, ignore_index=True)
         if frames
-        else pd.DataFrame(
-            columns=["datetime", "open", "high", "low", "close", "volume", "adjclose", "ticker"]
-        )
+        else pd.DataFrame(columns=["datetime", *OHLCV_COLS, "adjclose", "ticker"])
     )
     return df_all, metas, errors
 
@@ -171,19 +203,17 @@ META_FIELDS = [
 
 
 def metas_to_df(metas: dict[str, dict[str, Any]]) -> pd.DataFrame:
-    rows = []
+    # One list per field, filled in a single pass; object dtype keeps None (no NaN/NA fixup)
+    data: dict[str, list[Any]] = {k: [] for k in META_FIELDS}
     for sym, m in metas.items():
-        row = {k: m.get(k, None) for k in META_FIELDS}
-        row["symbol"] = row.get("symbol") or sym
-        rows.append(row)
-    dfm = pd.DataFrame(rows, columns=META_FIELDS)
-    # NaN/NA → None
-    dfm = dfm.where(pd.notnull(dfm), None).astype(object)
-    return dfm
+        for k, values in data.items():
+            values.append(m.get(k))
+        data["symbol"][-1] = data["symbol"][-1] or sym
+    return pd.DataFrame(data, columns=META_FIELDS, dtype=object)
 
 
 # ---------- BIST100 ----------
-BIST_SUBSET = [
+BIST_SUBSET = (
     "BTCIM.IS",
     "KOZAL.IS",
     "VESTL.IS",
@@ -284,4 +314,4 @@ BIST_SUBSET = [
     "GLRMK.IS",
     "DSTKF.IS",
     "BALSU.IS",
-]
+)
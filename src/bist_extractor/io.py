@@ -5,36 +5,90 @@ from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 
 
-def save_bist(
-    df: pd.DataFrame, rng: str, interval: str, prefix: str = "BIST100", out_dir: Path = Path("data")
-):
+def _with_datetime_tr(table: pa.Table) -> pa.Table:
+    """
+    Add datetime_tr (Turkey local time) next to a tz-aware 'datetime' column.
+    Arrow stores UTC instants, so this only changes the column's tz metadata.
+    """
+    if "datetime" not in table.column_names or "datetime_tr" in table.column_names:
+        return table
+    dt_type = table.schema.field("datetime").type
+    if not pa.types.is_timestamp(dt_type) or dt_type.tz is None:
+        return table
+    tr = table["datetime"].cast(pa.timestamp(dt_type.unit, tz="Europe/Istanbul"))
+    return table.append_column("datetime_tr", tr)
+
+
+def _as_seconds(table: pa.Table) -> pa.Table:
     """
-    Save DataFrame to CSV and Excel with auto-named file:
-    BIST100_<range>_<interval>_<YYYYMMDD_HHMMSS>.csv/xlsx
-    - Keeps tz-aware datetime in CSV
-    - Converts to tz-naive for Excel
-    - Adds datetime_local, datetime_utc, datetime_tr (Turkey local time)
+    Cast timestamp columns to second resolution so pyarrow's CSV writer renders bars as
+    `2023-11-14 22:13:20Z` whatever unit pandas produced (ns on pandas 2.x, s on 3.x).
+    Columns with sub-second values are left as they are rather than truncated.
     """
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_timestamp(field.type) or field.type.unit == "s":
+            continue
+        try:
+            col = table.column(i).cast(pa.timestamp("s", tz=field.type.tz))
+        except pa.ArrowInvalid:
+            continue
+        table = table.set_column(i, field.with_type(col.type), col)
+    return table
 
+
+def save_bist(
+    df: pd.DataFrame,
+    rng: str,
+    interval: str,
+    prefix: str = "BIST100",
+    out_dir: Path = Path("data"),
+    xlsx: bool = False,
+):
     """
-    Save a single combined CSV and XLSX for the whole batch under out_dir (default: data/).
+    Save a single combined Parquet + CSV (and optionally Excel) for the whole batch
+    under out_dir (default: data/) with auto-named files:
+    BIST100_<range>_<interval>_<YYYYMMDD_HHMMSS>.parquet/csv[/xlsx]
+    - Parquet (zstd) is the primary format; tz-aware datetime is preserved and
+      datetime_tr (Turkey local time) is added
+    - CSV is written by pyarrow's vectorized writer, keeping tz offsets
+    - Excel is opt-in (slow, cell-at-a-time): tz-naive datetime_local, datetime_utc,
+      datetime_tr (Turkey local time)
+    Returns (parquet_path, csv_path, xlsx_path or None).
     """
     out_dir.mkdir(parents=True, exist_ok=True)
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     stem = f"{prefix}_{rng}_{interval}_{ts}"
 
+    parquet_path = out_dir / f"{stem}.parquet"
     csv_path = out_dir / f"{stem}.csv"
     xlsx_path = out_dir / f"{stem}.xlsx"
 
-    # --- CSV: keep original DataFrame (tz-aware is OK in CSV) ---
-    df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    # Convert to Arrow once; Parquet and CSV are both written from the same table
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = _as_seconds(_with_datetime_tr(table))
+
+    # --- Parquet: columnar, compressed ---
+    pq.write_table(table, parquet_path, compression="zstd")
+
+    # --- CSV: tz-aware is OK in CSV; BOM so Excel detects UTF-8 ---
+    with open(csv_path, "wb") as fh:
+        fh.write("\ufeff".encode())
+        pacsv.write_csv(table, fh)
+
+    print(f"Saved PARQUET -> {os.path.abspath(parquet_path)}")
+    print(f"Saved CSV     -> {os.path.abspath(csv_path)}")
+    if not xlsx:
+        return parquet_path, csv_path, None
 
     # --- Excel: must strip tz-awareness ---
     df_xlsx = df.copy()
-    if "datetime" in df_xlsx.columns and pd.api.types.is_datetime64tz_dtype(df_xlsx["datetime"]):
+    if "datetime" in df_xlsx.columns and isinstance(df_xlsx["datetime"].dtype, pd.DatetimeTZDtype):
         tzname = str(df_xlsx["datetime"].dt.tz)  # e.g., Europe/Istanbul
 
         # Add timezone info column
@@ -65,6 +119,5 @@ def save_bist(
     # Write Excel
     df_xlsx.to_excel(xlsx_path, index=False, engine="openpyxl")
 
-    print(f"Saved CSV  -> {os.path.abspath(csv_path)}")
-    print(f"Saved XLSX -> {os.path.abspath(xlsx_path)}")
-    return csv_path, xlsx_path
+    print(f"Saved XLSX    -> {os.path.abspath(xlsx_path)}")
+    return parquet_path, csv_path, xlsx_path
@@ -1,3 +1,7 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -31,10 +35,77 @@ def _make_retry(max_retries: int, backoff_factor: float) -> Retry:
         )
 
 
-def get_yahoo_session(max_retries: int = 5, backoff_factor: float = 1.25) -> requests.Session:
+# ---------- per-host rate limiting ----------
+class _TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/sec, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that throttles outgoing requests with one token bucket per host."""
+
+    def __init__(self, rate_per_host: float | None = None, burst: float = 1.0, **kwargs):
+        if rate_per_host is not None and rate_per_host <= 0:
+            raise ValueError(f"rate_per_host must be > 0 or None (unlimited), got {rate_per_host}")
+        self._rate_per_host = rate_per_host
+        self._burst = max(burst, 1.0)
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def _bucket(self, host: str) -> _TokenBucket:
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = _TokenBucket(self._rate_per_host, self._burst)
+            return bucket
+
+    def send(self, request, **kwargs):
+        if self._rate_per_host is not None:
+            self._bucket(urlsplit(request.url).hostname or "").acquire()
+        return super().send(request, **kwargs)
+
+
+def get_yahoo_session(
+    max_retries: int = 5,
+    backoff_factor: float = 1.25,
+    rate_per_host: float | None = None,
+    burst: float = 1.0,
+    warmup: bool = True,
+) -> requests.Session:
+    """
+    Build a shared Yahoo session. Safe to use from a thread pool; when `rate_per_host`
+    is set (> 0), requests to each host are throttled to that many per second; None means
+    unthrottled.
+    With `warmup`, Yahoo cookies are fetched once here instead of once per symbol.
+    """
     sess = requests.Session()
     retry = _make_retry(max_retries, backoff_factor)
-    adapter = HTTPAdapter(max_retries=retry, pool_connections=10, pool_maxsize=10)
+    adapter = _RateLimitedAdapter(
+        rate_per_host=rate_per_host,
+        burst=burst,
+        max_retries=retry,
+        pool_connections=16,
+        pool_maxsize=32,
+    )
     sess.mount("https://", adapter)
     sess.mount("http://", adapter)
     sess.headers.update(
@@ -50,4 +121,11 @@ def get_yahoo_session(max_retries: int = 5, backoff_factor: float = 1.25) -> req
             "Cache-Control": "no-cache",
         }
     )
+
+    # warm-up cookies (once per session; fc.yahoo.com may answer 404 but still sets them)
+    if warmup:
+        try:
+            sess.get("https://fc.yahoo.com", timeout=5)
+        except Exception:
+            pass
     return sess
@@ -0,0 +1,180 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bist_extractor.db import _get_conn, close_db, ingest_prices, ingest_run, init_db
+from bist_extractor.fetch import metas_to_df
+
+
+@pytest.fixture(autouse=True)
+def _close_pooled_connections():
+    yield
+    close_db()
+
+
+def _bars():
+    dt = pd.to_datetime([1700000000, 1700000300], unit="s", utc=True).tz_convert("Europe/Istanbul")
+    return pd.DataFrame(
+        {
+            "datetime": dt,
+            "open": [1.0, 2.0],
+            "high": [1.5, 2.5],
+            "low": [0.5, np.nan],
+            "close": [1.2, 2.2],
+            "volume": [100.0, 200.0],
+            "adjclose": pd.NA,
+            "ticker": "GARAN.IS",
+            "range": "1d",
+            "interval": "5m",
+        }
+    )
+
+
+def test_ingest_prices_roundtrip(tmp_path):
+    db = str(tmp_path / "t.db")
+    init_db(db)
+    df = _bars()
+    run_id = ingest_prices(df, rng="1d", interval="5m", db_path=db)
+    ingest_prices(df, rng="1d", interval="5m", db_path=db)  # upsert, no duplicates
+
+    con = sqlite3.connect(db)
+    rows = con.execute(
+        "SELECT ticker, datetime_utc, low, adjclose, range_str, interval FROM prices "
+        "ORDER BY datetime_utc"
+    ).fetchall()
+    n_runs = con.execute("SELECT COUNT(*) FROM runs WHERE run_id=?", (run_id,)).fetchone()[0]
+    types = con.execute("SELECT DISTINCT typeof(open), typeof(low) FROM prices").fetchall()
+    con.close()
+
+    assert sorted(types) == [("real", "null"), ("real", "real")]
+    assert rows == [
+        ("GARAN.IS", 1700000000, 0.5, None, "1d", "5m"),
+        ("GARAN.IS", 1700000300, None, None, "1d", "5m"),
+    ]
+    assert n_runs == 1
+    assert "datetime_utc" not in df.columns  # input frame is left untouched
+
+
+def test_ingest_prices_chunks_multirow_insert(tmp_path, monkeypatch):
+    import bist_extractor.db as db_mod
+
+    monkeypatch.setattr(db_mod, "_max_variables", lambda con: 12 * 2)  # 2 rows/statement
+    db = str(tmp_path / "t.db")
+    init_db(db)
+    df = pd.concat([_bars(), _bars().assign(ticker="AKBNK.IS")], ignore_index=True)
+    ingest_prices(df.iloc[:3], rng="1d", interval="5m", db_path=db)
+
+    con = sqlite3.connect(db)
+    n = con.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+    con.close()
+    assert n == 3
+
+
+def test_ingest_run_single_transaction(tmp_path):
+    db = str(tmp_path / "t.db")
+    init_db(db)
+    df_meta = metas_to_df({"GARAN.IS": {"currency": "TRY", "regularMarketPrice": 1.2}})
+    run_id = ingest_run(_bars(), df_meta, rng="1d", interval="5m", db_path=db, note="t")
+
+    con = sqlite3.connect(db)
+    n_prices = con.execute("SELECT COUNT(*) FROM prices WHERE run_id=?", (run_id,)).fetchone()[0]
+    meta = con.execute("SELECT symbol, currency, run_id FROM meta").fetchall()
+    run = con.execute("SELECT n_rows, note FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    con.close()
+
+    assert n_prices == 2
+    assert meta == [("GARAN.IS", "TRY", run_id)]
+    assert run == (2, "t")
+
+
+def test_ingest_run_rolls_back_on_error(tmp_path):
+    db = str(tmp_path / "t.db")
+    init_db(db)
+    bad_meta = pd.DataFrame({"symbol": ["GARAN.IS"]})  # missing META_FIELDS -> KeyError
+    with pytest.raises(KeyError):
+        ingest_run(_bars(), bad_meta, rng="1d", interval="5m", db_path=db)
+
+    con = sqlite3.connect(db)
+    counts = [con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("prices", "runs")]
+    con.close()
+    assert counts == [0, 0]
+
+
+def test_get_conn_reuses_connection(tmp_path):
+    db = str(tmp_path / "t.db")
+    con = _get_conn(db)
+    assert _get_conn(db) is con
+    assert con.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+    close_db(db)
+    assert _get_conn(db) is not con
+
+
+def test_init_db_indexes(tmp_path):
+    db = str(tmp_path / "t.db")
+    init_db(db)
+    con = sqlite3.connect(db)
+    names = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    plan = con.execute(
+        "EXPLAIN QUERY PLAN SELECT close FROM prices WHERE ticker=? AND datetime_utc BETWEEN ? AND ?",
+        ("GARAN.IS", 0, 1),
+    ).fetchall()
+    con.close()
+
+    assert "idx_prices_dt_close" in names
+    assert not names & {"idx_prices_ticker", "idx_prices_dt"}
+    assert "sqlite_autoindex_prices_1" in " ".join(r[-1] for r in plan)
+
+
+def test_init_db_migrates_text_datetimes(tmp_path):
+    db = str(tmp_path / "old.db")
+    con = sqlite3.connect(db)
+    con.execute(
+        """
+        CREATE TABLE prices (
+            ticker TEXT NOT NULL, datetime_utc TEXT NOT NULL, datetime_local TEXT,
+            datetime_tr TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL,
+            adjclose REAL, range_str TEXT, interval TEXT, ingested_at TEXT NOT NULL,
+            run_id TEXT NOT NULL, PRIMARY KEY (ticker, datetime_utc, interval)
+        );
+        """
+    )
+    con.execute(
+        "INSERT INTO prices VALUES ('GARAN.IS', '2023-11-14 22:13:20', NULL, NULL,"
+        " 1, 1, 1, 1, 1, NULL, '1d', '5m', 'x', 'r')"
+    )
+    con.commit()
+    con.close()
+
+    init_db(db)
+
+    con = sqlite3.connect(db)
+    row = con.execute("SELECT datetime_utc, typeof(datetime_utc) FROM prices").fetchone()
+    con.close()
+    assert row == (1700000000, "integer")
+
+
+def test_transaction_rolls_back_when_commit_fails(tmp_path):
+    from bist_extractor.db import _transaction
+
+    con = _get_conn(str(tmp_path / "t.db"))
+    con.executescript(
+        """
+        PRAGMA foreign_keys=ON;
+        CREATE TABLE parent (id INTEGER PRIMARY KEY);
+        CREATE TABLE child (
+            pid INTEGER REFERENCES parent(id) DEFERRABLE INITIALLY DEFERRED
+        );
+        """
+    )
+    # deferred FK violation only surfaces at COMMIT
+    with pytest.raises(sqlite3.IntegrityError):
+        with _transaction(con) as cur:
+            cur.execute("INSERT INTO child VALUES (1);")
+    assert not con.in_transaction
+
+    with _transaction(con) as cur:  # connection is reusable
+        cur.execute("INSERT INTO parent VALUES (1);")
+        cur.execute("INSERT INTO child VALUES (1);")
+    assert con.execute("SELECT COUNT(*) FROM child").fetchone()[0] == 1
@@ -0,0 +1,168 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bist_extractor.fetch import _float_array, fetch_batch, fetch_yahoo_chart
+from bist_extractor.session import _TokenBucket, get_yahoo_session
+
+PAYLOAD = {
+    "chart": {
+        "result": [
+            {
+                "meta": {"symbol": "GARAN.IS", "currency": "TRY", "timezone": "TRT"},
+                "timestamp": [1700000000, 1700000300, 1700000600],
+                "indicators": {
+                    "quote": [
+                        {
+                            "open": [1.0, None, 3.0],
+                            "high": [1.5, None, 3.5],
+                            "low": [0.5, None, 2.5],
+                            "close": [1.2, None, 3.2],
+                            "volume": [100, None, 300],
+                        }
+                    ],
+                    "adjclose": [{"adjclose": [1.1, None, 3.1]}],
+                },
+            }
+        ],
+        "error": None,
+    }
+}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+
+def test_fetch_yahoo_chart_parses_payload():
+    sess = FakeSession([FakeResponse(PAYLOAD)])
+    df, meta = fetch_yahoo_chart("GARAN.IS", rng="1d", interval="5m", session=sess)
+
+    assert meta["currency"] == "TRY"
+    assert len(sess.urls) == 1 and "query1.finance.yahoo.com" in sess.urls[0]
+    assert len(df) == 3
+    assert df["datetime"].iloc[0] == pd.Timestamp(1700000000, unit="s", tz="UTC")
+    assert df["open"].tolist()[::2] == [1.0, 3.0] and pd.isna(df["open"].iloc[1])
+    assert df["adjclose"].tolist()[::2] == [1.1, 3.1]
+    assert set(df["ticker"]) == {"GARAN.IS"}
+    assert set(df["interval"]) == {"5m"}
+
+
+def test_fetch_yahoo_chart_fails_over_to_next_host():
+    sess = FakeSession([FakeResponse({}, status_code=503), FakeResponse(PAYLOAD)])
+    df, _ = fetch_yahoo_chart("GARAN.IS", session=sess)
+
+    assert len(df) == 3
+    assert [u.split("/")[2] for u in sess.urls] == [
+        "query1.finance.yahoo.com",
+        "query2.finance.yahoo.com",
+    ]
+
+
+def test_fetch_yahoo_chart_raises_after_all_hosts_fail():
+    sess = FakeSession([FakeResponse({}, status_code=429), FakeResponse({}, status_code=429)])
+    with pytest.raises(RuntimeError, match="Failed to fetch GARAN.IS"):
+        fetch_yahoo_chart("GARAN.IS", session=sess)
+    assert len(sess.urls) == 2
+
+
+def test_float_array_pads_and_coerces():
+    assert np.array_equal(_float_array([1, None], 3), [1.0, np.nan, np.nan], equal_nan=True)
+    assert np.array_equal(_float_array([1, "x", 2], 2), [1.0, np.nan], equal_nan=True)
+    assert _float_array(None, 2).dtype == np.float64
+
+
+def test_fetch_yahoo_chart_sorts_out_of_order_bars():
+    payload = json.loads(json.dumps(PAYLOAD))
+    result = payload["chart"]["result"][0]
+    result["timestamp"] = result["timestamp"][::-1]
+    sess = FakeSession([FakeResponse(payload)])
+    df, _ = fetch_yahoo_chart("GARAN.IS", session=sess)
+
+    assert df["datetime"].is_monotonic_increasing
+    assert df.index.tolist() == [0, 1, 2]
+    assert df["open"].iloc[0] == 3.0
+
+
+class RoutingSession:
+    """Thread-safe fake: answers per symbol, failing the ones in `fail`."""
+
+    def __init__(self, fail=(), delays=None):
+        self.headers = {}
+        self.fail = set(fail)
+        self.delays = delays or {}
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        sym = url.split("/chart/")[1].split("?")[0]
+        time.sleep(self.delays.get(sym, 0))
+        if sym in self.fail:
+            return FakeResponse({}, status_code=503)
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["chart"]["result"][0]["meta"]["symbol"] = sym
+        return FakeResponse(payload)
+
+
+def test_fetch_batch_keeps_input_order_and_collects_errors():
+    # earlier symbols answer last, so as_completed order differs from input order
+    sess = RoutingSession(fail={"BAD.IS"}, delays={"A.IS": 0.2, "B.IS": 0.1})
+    df, metas, errors = fetch_batch(
+        ["A.IS", "B.IS", "BAD.IS", "C.IS", "A.IS"], max_workers=4, session=sess
+    )
+
+    assert df["ticker"].unique().tolist() == ["A.IS", "B.IS", "C.IS"]
+    assert len(df) == 9
+    assert set(metas) == {"A.IS", "B.IS", "C.IS"}
+    assert list(errors) == ["BAD.IS"] and "Failed to fetch BAD.IS" in errors["BAD.IS"]
+
+
+def test_fetch_batch_alternates_first_host():
+    sess = RoutingSession()
+    fetch_batch(["A.IS", "B.IS", "C.IS", "D.IS"], max_workers=1, session=sess)
+
+    first_host = {u.split("/chart/")[1].split("?")[0]: u.split("/")[2] for u in sess.urls}
+    assert first_host == {
+        "A.IS": "query1.finance.yahoo.com",
+        "B.IS": "query2.finance.yahoo.com",
+        "C.IS": "query1.finance.yahoo.com",
+        "D.IS": "query2.finance.yahoo.com",
+    }
+
+
+def test_token_bucket_throttles():
+    bucket = _TokenBucket(rate=2, capacity=4)
+    start = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    # 4 burst tokens are free; the remaining 6 arrive at 2/s
+    assert 2.8 < elapsed < 3.6
+
+
+def test_rate_limited_adapter_rejects_non_positive_rate():
+    with pytest.raises(ValueError, match="rate_per_host"):
+        get_yahoo_session(rate_per_host=0, warmup=False)
@@ -0,0 +1,87 @@
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bist_extractor.io import _as_seconds, _with_datetime_tr, save_bist
+
+
+def _bars():
+    return pd.DataFrame(
+        {
+            "datetime": pd.to_datetime([1700000000, 1700000300], unit="s", utc=True),
+            "open": [1.0, None],
+            "close": [1.2, 2.2],
+            "ticker": "GARAN.IS",
+        }
+    )
+
+
+def test_save_bist_default_writes_parquet_and_csv(tmp_path):
+    result = save_bist(_bars(), rng="1d", interval="5m", out_dir=tmp_path)
+
+    assert len(result) == 3
+    parquet_path, csv_path, xlsx_path = result
+    assert xlsx_path is None
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".csv", ".parquet"]
+    assert parquet_path.name.startswith("BIST100_1d_5m_")
+    assert parquet_path.stem == csv_path.stem
+
+    raw = csv_path.read_bytes()
+    assert raw.startswith(b"\xef\xbb\xbf")
+    header = raw[3:].decode().splitlines()[0]
+    assert header == '"datetime","open","close","ticker","datetime_tr"'
+
+    back = pq.read_table(parquet_path).to_pandas()
+    assert len(back) == 2
+    assert back["ticker"].tolist() == ["GARAN.IS", "GARAN.IS"]
+    assert back["close"].tolist() == [1.2, 2.2]
+
+
+def test_save_bist_xlsx_opt_in(tmp_path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # e.g. deprecated dtype checks in the XLSX branch
+        _, _, xlsx_path = save_bist(_bars(), rng="1d", interval="5m", out_dir=tmp_path, xlsx=True)
+
+    assert xlsx_path is not None and xlsx_path.exists()
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".csv", ".parquet", ".xlsx"]
+    xl = pd.read_excel(xlsx_path)
+    assert list(xl.columns[:4]) == ["datetime_local", "datetime_utc", "datetime_tr", "tz"]
+    assert len(xl) == 2
+
+
+def test_save_bist_adds_turkish_local_time(tmp_path):
+    # ns resolution is what pandas 2.x produces; the CSV text must not depend on it
+    df = _bars().assign(datetime=lambda d: d["datetime"].dt.as_unit("ns"))
+    parquet_path, csv_path, _ = save_bist(df, rng="1d", interval="5m", out_dir=tmp_path)
+
+    dt_tr = pq.read_schema(parquet_path).field("datetime_tr").type
+    assert pa.types.is_timestamp(dt_tr) and dt_tr.tz == "Europe/Istanbul"
+
+    first_row = csv_path.read_text(encoding="utf-8-sig").splitlines()[1]
+    assert first_row.startswith("2023-11-14 22:13:20Z,")
+    assert first_row.endswith(",2023-11-15 01:13:20+0300")
+
+
+def test_with_datetime_tr_skips_non_tz_datetime(tmp_path):
+    empty = pd.DataFrame(columns=["datetime", "open", "close", "ticker"])
+    as_text = _bars().assign(datetime=lambda d: d["datetime"].astype(str).astype(object))
+    naive = _bars().assign(datetime=lambda d: d["datetime"].dt.tz_localize(None))
+
+    for df in (empty, as_text, naive):
+        table = _with_datetime_tr(pa.Table.from_pandas(df, preserve_index=False))
+        assert "datetime_tr" not in table.column_names
+
+    parquet_path, _, _ = save_bist(empty, rng="1d", interval="5m", out_dir=tmp_path)
+    assert pq.read_table(parquet_path).num_rows == 0
+
+
+def test_as_seconds_normalizes_timestamp_resolution():
+    ns = pa.array([1700000000 * 10**9], pa.timestamp("ns", tz="UTC"))
+    sub_second = pa.array([1700000000 * 10**9 + 5], pa.timestamp("ns", tz="UTC"))
+    table = _as_seconds(pa.table({"datetime": ns, "fine": sub_second, "x": [1.0]}))
+
+    assert table.schema.field("datetime").type == pa.timestamp("s", tz="UTC")
+    assert table.schema.field("fine").type == pa.timestamp("ns", tz="UTC")  # not truncated
+    assert table["datetime"][0].value == 1700000000
@@ -12,3 +12,21 @@ def test_cli_help(capsys):
     )
     assert res.returncode == 0
     assert "BIST100 Extractor CLI" in res.stdout
+
+
+def test_cli_rejects_non_positive_workers_and_rate(capsys):
+    import pytest
+
+    from bist_extractor.cli import parse_args
+
+    base = ["--range", "1d", "--interval", "5m"]
+    for bad in (["--workers", "0"], ["--rate", "0"], ["--rate", "-1"]):
+        with pytest.raises(SystemExit):
+            parse_args(base + bad)
+        assert "must be > 0" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        parse_args(base + ["--workers", "x"])
+    assert "invalid int value" in capsys.readouterr().err
+
+    args = parse_args(base + ["--workers", "4", "--rate", "0.5"])
+    assert (args.workers, args.rate) == (4, 0.5)